@@ -2,14 +2,25 @@
 """Sandboxer - Minimal web terminal manager."""
 
 import asyncio
+import atexit
+import base64
+import ctypes
+import functools
+import heapq
 import http.server
 import json
 import os
+import re
+import shutil
 import signal
 import socketserver
+import struct
 import subprocess
 import threading
+import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from html import escape
 
 # ═══ Config ═══
@@ -17,7 +28,14 @@ PORT = 8081
 WS_PORT = 8082
 GIT_DIR = "/home/sandboxer/git"
 DATA_DIR = "/etc/sandboxer"
+CRON_LOG_DIR = "/var/log/sandboxer"
 SYSTEM_PROMPT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "system-prompt.txt")
+CRON_RECHECK_INTERVAL = 30  # Max sleep between cron set checks (s)
+CRON_RESCAN_INTERVAL = 600  # Fallback full cron rescan (s) in case inotify misses events
+SAVE_DELAY = 0.2  # Coalesce session state writes within this window (s)
+TMUX_LIST_TTL = 1.0  # Reuse a tmux session listing for this long (s)
+CRON_CONDITION_TTL = 15  # Reuse a condition's result (s); a quarter of the shortest cron interval
+CRON_CONDITION_TIMEOUT = 60  # A condition still running after this counts as not met (s)
 
 # Session state (persisted to JSON)
 _sessions: dict[str, dict] = {}  # name -> {workdir, type}
@@ -46,91 +64,195 @@ def _load():
         _selected_folder = "/"
 
 
+_save_timer: threading.Timer | None = None
+_save_lock = threading.Lock()
+
+
+_written: dict[str, str] = {}  # path -> text last written by us
+
+
+def _write_atomic(path: str, text: str):
+    """Write a file via temp file + rename, so a crash never leaves it truncated; hold _save_lock."""
+    if _written.get(path) == text:
+        return  # e.g. a reorder leaves sessions.json as it was
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    # fsync the directory too, or the rename itself may not survive a crash
+    dir_fd = os.open(os.path.dirname(path), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    _written[path] = text
+
+
+def _flush():
+    """Write pending session state to disk now."""
+    global _save_timer
+    with _save_lock:
+        if _save_timer is None:
+            return
+        _save_timer.cancel()
+        _save_timer = None
+        os.makedirs(DATA_DIR, exist_ok=True)
+        _write_atomic(f"{DATA_DIR}/sessions.json", json.dumps(_sessions))
+        _write_atomic(f"{DATA_DIR}/order.json", json.dumps(_order))
+
+
 def _save():
-    os.makedirs(DATA_DIR, exist_ok=True)
-    with open(f"{DATA_DIR}/sessions.json", "w") as f:
-        json.dump(_sessions, f)
-    with open(f"{DATA_DIR}/order.json", "w") as f:
-        json.dump(_order, f)
+    """Schedule a state write; a burst of changes within SAVE_DELAY costs one write."""
+    global _save_timer
+    with _save_lock:
+        if _save_timer is None:
+            _save_timer = threading.Timer(SAVE_DELAY, _flush)
+            _save_timer.daemon = True
+            _save_timer.start()
 
 
 # ═══ tmux Operations ═══
 
-def get_tmux_sessions() -> list[str]:
-    """Get list of tmux session names."""
-    r = subprocess.run(["tmux", "list-sessions", "-F", "#{session_name}"],
-                       capture_output=True, text=True)
-    if r.returncode != 0:
-        return []
-    return [s for s in r.stdout.strip().split("\n") if s and not s.startswith("split-")]
+TMUX = shutil.which("tmux") or "tmux"
 
 
-def get_pane_title(name: str) -> str:
-    """Get pane title for a session."""
-    r = subprocess.run(["tmux", "display-message", "-t", name, "-p", "#{pane_title}"],
-                       capture_output=True, text=True)
-    title = r.stdout.strip() if r.returncode == 0 else ""
+def _tmux(*args: str, capture: bool = False) -> subprocess.CompletedProcess:
+    """Run a tmux command via posix_spawn (needs absolute path + close_fds=False)."""
+    # Python-created fds are non-inheritable, so close_fds=False leaks nothing
+    if capture:
+        return subprocess.run([TMUX, *args], close_fds=False, capture_output=True, text=True)
+    return subprocess.run([TMUX, *args], close_fds=False,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+_tmux_list: tuple[float, dict[str, tuple[str, str]]] | None = None  # (monotonic time, listing)
+_tmux_list_lock = threading.Lock()
+
+
+def _list_sessions() -> dict[str, tuple[str, str]]:
+    """Map tmux session name -> (active pane title, window activity), cached for TMUX_LIST_TTL."""
+    # A page render asks for the session list several times; share one list-sessions
+    global _tmux_list
+    with _tmux_list_lock:
+        if _tmux_list and time.monotonic() - _tmux_list[0] < TMUX_LIST_TTL:
+            return _tmux_list[1]
+        sessions = _read_sessions()
+        _tmux_list = (time.monotonic(), sessions)
+        return sessions
+
+
+def _invalidate_sessions():
+    """Drop the cached session list after creating or killing a session."""
+    # Call after updating _sessions/_order, so get_sessions can't memoize a half-updated state
+    global _tmux_list
+    with _tmux_list_lock:
+        _tmux_list = None
+
+
+def _read_sessions() -> dict[str, tuple[str, str]]:
+    """Map tmux session name -> (active pane title, window activity), from one list-sessions call."""
+    # window_activity is bumped by pane output (session_activity only by client input)
+    r = _tmux("list-sessions", "-F", "#{session_name}\t#{window_activity}\t#{pane_title}", capture=True)
+    if r.returncode != 0:
+        return {}
+    sessions = {}
+    for line in r.stdout.split("\n"):  # Not splitlines(): titles may contain \x1c, \u2028, ...
+        name, _, rest = line.partition("\t")
+        activity, _, title = rest.partition("\t")
+        if name and not name.startswith("split-"):
+            sessions[name] = (title.strip(), activity)
+    return sessions
+
+
+def _clean_title(title: str, name: str) -> str:
+    """Strip Claude's ✳ marker, falling back to the session name for default titles."""
     if title.startswith("✳ "):
         title = title[2:]
     return title if title and title != "Window Title" else name
 
 
-def create_session(name: str, session_type: str, workdir: str):
-    """Create a tmux session."""
-    subprocess.run(["tmux", "new-session", "-d", "-s", name, "-c", workdir], capture_output=True)
-    subprocess.run(["tmux", "set", "-t", name, "mouse", "on"], capture_output=True)
+def get_pane_title(name: str) -> str:
+    """Get pane title for a session."""
+    r = _tmux("display-message", "-t", name, "-p", "#{pane_title}", capture=True)
+    return _clean_title(r.stdout.strip() if r.returncode == 0 else "", name)
+
 
+def create_session(name: str, session_type: str, workdir: str) -> bool:
+    """Create a tmux session, False if tmux refused (e.g. the name is taken)."""
+    # One tmux invocation: create, enable mouse and start the tool
+    args = ["new-session", "-d", "-s", name, "-c", workdir, ";", "set", "-t", name, "mouse", "on"]
     if session_type == "claude":
         cmd = f"IS_SANDBOX=1 claude --dangerously-skip-permissions --system-prompt {SYSTEM_PROMPT}"
-        subprocess.run(["tmux", "send-keys", "-t", name, cmd, "Enter"], capture_output=True)
+        args += [";", "send-keys", "-t", name, cmd, "Enter"]
     elif session_type == "gemini":
-        subprocess.run(["tmux", "send-keys", "-t", name, "gemini", "Enter"], capture_output=True)
+        args += [";", "send-keys", "-t", name, "gemini", "Enter"]
     elif session_type == "lazygit":
-        subprocess.run(["tmux", "send-keys", "-t", name, "lazygit", "Enter"], capture_output=True)
+        args += [";", "send-keys", "-t", name, "lazygit", "Enter"]
+    if _tmux(*args).returncode != 0:
+        _invalidate_sessions()  # Listing missed a session; don't clobber its metadata
+        return False
 
     _sessions[name] = {"workdir": workdir, "type": session_type}
     if name not in _order:
         _order.append(name)
+    _invalidate_sessions()
     _save()
+    return True
 
 
 def kill_session(name: str):
     """Kill a tmux session."""
-    subprocess.run(["tmux", "kill-session", "-t", name], capture_output=True)
+    _tmux("kill-session", "-t", name)
     _sessions.pop(name, None)
     if name in _order:
         _order.remove(name)
+    _invalidate_sessions()
     _save()
 
 
+_name_counters: dict[str, int] = {}  # name prefix -> highest number issued
+_name_lock = threading.Lock()
+
+
 def generate_name(session_type: str, workdir: str) -> str:
     """Generate session name: <dir>-<type>-<n>."""
     dir_name = os.path.basename(workdir.rstrip("/")) or "root"
     dir_name = dir_name.replace(".", "_")
     prefix = f"{dir_name}-{session_type}-"
 
-    existing = get_tmux_sessions()
-    max_n = 0
-    for s in existing:
-        if s.startswith(prefix):
-            try:
-                max_n = max(max_n, int(s[len(prefix):]))
-            except:
-                pass
-    return f"{prefix}{max_n + 1}"
+    # Also honour live sessions: sandboxer-shell creates <dir>-<type>-<n> directly in tmux
+    n = 0
+    for s in _list_sessions():  # cached, usually no tmux call
+        if s.startswith(prefix) and s[len(prefix):].isdigit():
+            n = max(n, int(s[len(prefix):]))
+    with _name_lock:
+        n = max(n, _name_counters.get(prefix, 0)) + 1
+        _name_counters[prefix] = n
+    return f"{prefix}{n}"
 
 
 # ═══ Session List ═══
 
+_session_list: tuple[dict, list[str], list[dict]] | None = None  # (tmux listing, order, result)
+
+
 def get_sessions() -> list[dict]:
     """Get ordered session list with metadata."""
-    tmux = set(get_tmux_sessions())
+    global _session_list
+    tmux = _list_sessions()  # name -> (pane title, activity)
+    # Same listing object and order as last time: nothing can have changed
+    if _session_list and _session_list[0] is tmux and _session_list[1] == _order:
+        return _session_list[2]
 
     # Clean stale entries
-    for name in list(_sessions.keys()):
-        if name not in tmux:
-            del _sessions[name]
-    _order[:] = [n for n in _order if n in tmux]
+    stale = _sessions.keys() - tmux.keys()
+    for name in stale:
+        del _sessions[name]
+    order = [n for n in _order if n in tmux]
+    changed = bool(stale) or len(order) != len(_order)
+    _order[:] = order
 
     # Build ordered list
     result = []
@@ -140,18 +262,21 @@ def get_sessions() -> list[dict]:
             meta = _sessions.get(name, {})
             result.append({
                 "name": name,
-                "title": get_pane_title(name),
+                "title": _clean_title(tmux[name][0], name),
                 "workdir": meta.get("workdir", ""),
                 "type": meta.get("type", "bash"),
             })
             seen.add(name)
 
     # Add untracked sessions
-    for name in tmux - seen:
-        result.append({"name": name, "title": get_pane_title(name), "workdir": "", "type": "bash"})
+    for name in tmux.keys() - seen:
+        result.append({"name": name, "title": _clean_title(tmux[name][0], name), "workdir": "", "type": "bash"})
         _order.append(name)
+        changed = True
 
-    _save()
+    if changed:
+        _save()
+    _session_list = (tmux, list(_order), result)
     return result
 
 
@@ -159,10 +284,8 @@ def get_directories() -> list[str]:
     """Get list of git directories."""
     dirs = ["/"]
     try:
-        for e in sorted(os.listdir(GIT_DIR)):
-            p = f"{GIT_DIR}/{e}"
-            if os.path.isdir(p) and not e.startswith("."):
-                dirs.append(p)
+        with os.scandir(GIT_DIR) as it:
+            dirs += sorted(e.path for e in it if not e.name.startswith(".") and e.is_dir())
     except:
         pass
     return dirs
@@ -192,6 +315,24 @@ def build_folder_options(active_folder: str = None) -> str:
     return "\n".join(opts)
 
 
+_CRON_CANONICAL = {
+    "* * * * *": "every min",
+}
+_DOW_NAMES = {0: "sun", 1: "mon", 2: "tue", 3: "wed", 4: "thu", 5: "fri", 6: "sat"}
+_CRON_PATTERNS = [
+    # Every N minutes
+    (re.compile(r"\*/(\S*) \* \* \* \*"), lambda m: f"every {m[1]}m"),
+    # Every hour at specific minute
+    (re.compile(r"\d+ \* \* \* \*"), lambda m: "every hour"),
+    # Specific time daily
+    (re.compile(r"(\d+) (\d+) \* \* \*"), lambda m: f"daily {m[2]}:{m[1].zfill(2)}"),
+    # Specific weekday
+    (re.compile(r"(\d+) (\d+) \* \* (\d+)"),
+     lambda m: f"{_DOW_NAMES.get(int(m[3]), m[3])} {m[2]}:{m[1].zfill(2)}"),
+]
+
+
+@functools.lru_cache(maxsize=256)
 def cron_to_human(schedule: str) -> str:
     """Convert cron schedule to human-readable format."""
     if not schedule:
@@ -200,183 +341,444 @@ def cron_to_human(schedule: str) -> str:
     if len(parts) != 5:
         return schedule
 
-    minute, hour, dom, month, dow = parts
+    normalized = " ".join(parts)
+    human = _CRON_CANONICAL.get(normalized)
+    if human:
+        return human
+    for pattern, fmt in _CRON_PATTERNS:
+        m = pattern.fullmatch(normalized)
+        if m:
+            return fmt(m)
 
-    # Every N minutes
-    if minute.startswith("*/") and hour == "*" and dom == "*" and month == "*" and dow == "*":
-        n = minute[2:]
-        return f"every {n}m"
+    return schedule[:15]
 
-    # Every minute
-    if minute == "*" and hour == "*" and dom == "*" and month == "*" and dow == "*":
-        return "every min"
 
-    # Every hour at specific minute
-    if minute.isdigit() and hour == "*" and dom == "*" and month == "*" and dow == "*":
-        return "every hour"
+# ═══ Cron Discovery ═══
+# Cron files are rescanned only when inotify reports a change below GIT_DIR,
+# with a slow periodic rescan as fallback for missed events.
 
-    # Specific time daily
-    if minute.isdigit() and hour.isdigit() and dom == "*" and month == "*" and dow == "*":
-        return f"daily {hour}:{minute.zfill(2)}"
+_cron_cache: dict[str, tuple[int, int, dict]] = {}  # path -> (mtime_ns, size, cron)
+_cron_dirs: dict[str, tuple[int, list[str]]] = {}  # .sandboxer dir -> (mtime_ns, cron files)
 
-    # Specific weekday
-    dow_names = {0: "sun", 1: "mon", 2: "tue", 3: "wed", 4: "thu", 5: "fri", 6: "sat"}
-    if minute.isdigit() and hour.isdigit() and dom == "*" and month == "*" and dow.isdigit():
-        return f"{dow_names.get(int(dow), dow)} {hour}:{minute.zfill(2)}"
 
-    return schedule[:15]
+@functools.lru_cache(maxsize=1)
+def _yaml_load():
+    """yaml.load bound to the safe loader, imported once (libyaml-backed when available)."""
+    import yaml
+    return functools.partial(yaml.load, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
 
 
-def get_crons() -> list[dict]:
-    """Get all cron jobs from .sandboxer/cron-*.yaml files."""
-    import glob
+def parse_cron_file(path: str, workdir: str) -> dict | None:
+    """Parse a cron YAML file, reusing the cached result while it is unchanged."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    cached = _cron_cache.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+
+    try:
+        with open(path) as fp:
+            data = _yaml_load()(fp)
+        name = os.path.basename(path).replace("cron-", "").replace(".yaml", "")
+        schedule = data.get("schedule", "")
+        cron = {
+            "name": name,
+            "path": path,
+            "workdir": workdir,
+            "schedule": schedule,
+            "schedule_human": cron_to_human(schedule),
+            "type": data.get("type", "bash"),
+            "command": data.get("command", ""),
+            "prompt": data.get("prompt", ""),
+            "condition": data.get("condition", ""),
+            "enabled": data.get("enabled", True),
+        }
+    except:
+        cron = None
+    _cron_cache[path] = (st.st_mtime_ns, st.st_size, cron)
+    return cron
+
+
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_ISDIR = 0x40000000
+_DIR_EVENTS = _IN_CREATE | _IN_DELETE | _IN_MOVED_FROM | _IN_MOVED_TO
+_FILE_EVENTS = _DIR_EVENTS | _IN_CLOSE_WRITE
+
+_EVENT = struct.Struct("iIII")  # struct inotify_event: wd, mask, cookie, len
+_CRON_FILE_RE = re.compile(r"cron-.*\.yaml", re.DOTALL)
+
+_inotify_fd: int | None = None
+_libc = None
+_git_dir_wd = -1
+_watches_complete = False  # Every scanned dir got a watch; otherwise rescan every CRON_RECHECK_INTERVAL
+_crons: list[dict] | None = None
+_crons_scanned = 0.0
+_crons_lock = threading.Lock()
+_cron_wakeup = threading.Event()  # Set when the cron set changes, wakes the scheduler
+_cron_stop = threading.Event()
+
+
+def _inotify_init():
+    """Open a non-blocking inotify fd. Without it every get_crons() rescans."""
+    global _inotify_fd, _libc
+    try:
+        _libc = ctypes.CDLL(None, use_errno=True)
+        fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return
+    if fd >= 0:
+        _inotify_fd = fd
+
+
+def _watch(path: str, mask: int) -> int:
+    """Add (or refresh) an inotify watch; re-adding a watched path is a no-op."""
+    global _watches_complete
+    wd = -1
+    if _inotify_fd is not None:
+        wd = _libc.inotify_add_watch(_inotify_fd, os.fsencode(path), mask)
+    if wd < 0:
+        _watches_complete = False  # e.g. ENOSPC when max_user_watches is used up
+    return wd
+
+
+def _is_cron_event(wd: int, mask: int, name: bytes) -> bool:
+    """Whether an inotify event can change the set of cron files."""
+    if mask & (_IN_Q_OVERFLOW | _IN_IGNORED):
+        return True
+    if wd == _git_dir_wd:
+        return bool(mask & _IN_ISDIR)  # repo added/removed
+    name = os.fsdecode(name.rstrip(b"\0"))
+    return name == ".sandboxer" or _CRON_FILE_RE.fullmatch(name) is not None
+
+
+def _crons_changed() -> bool:
+    """Drain pending inotify events, True if any of them touched a cron file."""
+    if _inotify_fd is None:
+        return True
+    changed = False
+    while True:
+        try:
+            buf = os.read(_inotify_fd, 65536)
+        except BlockingIOError:
+            break
+        if not buf:
+            break
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _, length = _EVENT.unpack_from(buf, offset)
+            offset += _EVENT.size
+            if not changed and _is_cron_event(wd, mask, buf[offset:offset + length]):
+                changed = True
+            offset += length
+    return changed
+
+
+def _list_cron_files(cron_dir: str) -> list[str]:
+    """List cron-*.yaml in a .sandboxer dir, skipping the listdir if its mtime is unchanged."""
+    try:
+        st = os.stat(cron_dir)
+    except OSError:
+        _cron_dirs.pop(cron_dir, None)
+        return []
+    cached = _cron_dirs.get(cron_dir)
+    if cached and cached[0] == st.st_mtime_ns:
+        return cached[1]
+
+    watched = _watch(cron_dir, _FILE_EVENTS) >= 0
+    with os.scandir(cron_dir) as it:
+        files = [e.path for e in it if _CRON_FILE_RE.fullmatch(e.name) and e.is_file()]
+    # Timestamps are coarse: only trust an mtime once it is old enough that
+    # a later change would have to bump it (same idea as git's racy-index check).
+    # Without a watch, don't cache either, so the next scan retries the watch
+    if watched and time.time_ns() - st.st_mtime_ns > 2_000_000_000:
+        _cron_dirs[cron_dir] = (st.st_mtime_ns, files)
+    return files
+
+
+def _scan_crons() -> list[dict]:
+    global _git_dir_wd, _watches_complete
+    _watches_complete = True  # _watch clears it if any watch below fails
+    _git_dir_wd = _watch(GIT_DIR, _DIR_EVENTS)
+    candidates = []  # (path, workdir)
+    seen_dirs = set()
+    # scandir's d_type answers is_dir without a stat per repo (symlinked repos still stat)
+    try:
+        with os.scandir(GIT_DIR) as it:
+            repos = sorted(e.path for e in it if not e.name.startswith(".") and e.is_dir())
+    except OSError:
+        repos = []
+    for d in repos:
+        _watch(d, _DIR_EVENTS)
+        cron_dir = f"{d}/.sandboxer"
+        seen_dirs.add(cron_dir)
+        candidates.extend((f, d) for f in _list_cron_files(cron_dir))
+
+    # Many uncached files (cold start): parse them concurrently to overlap file I/O,
+    # the loop below then hits the cache
+    uncached = [c for c in candidates if c[0] not in _cron_cache]
+    if len(uncached) >= 4:
+        with ThreadPoolExecutor(max_workers=min(16, len(uncached))) as ex:
+            list(ex.map(lambda c: parse_cron_file(*c), uncached))
+
     crons = []
-    for d in get_directories():
-        if d == "/":
-            continue
-        pattern = f"{d}/.sandboxer/cron-*.yaml"
-        for f in glob.glob(pattern):
-            try:
-                import yaml
-                with open(f) as fp:
-                    data = yaml.safe_load(fp)
-                name = os.path.basename(f).replace("cron-", "").replace(".yaml", "")
-                schedule = data.get("schedule", "")
-                crons.append({
-                    "name": name,
-                    "path": f,
-                    "workdir": d,
-                    "schedule": schedule,
-                    "schedule_human": cron_to_human(schedule),
-                    "type": data.get("type", "bash"),
-                    "command": data.get("command", ""),
-                    "prompt": data.get("prompt", ""),
-                    "condition": data.get("condition", ""),
-                    "enabled": data.get("enabled", True),
-                })
-            except:
-                pass
+    for f, d in candidates:
+        cron = parse_cron_file(f, d)
+        if cron:
+            crons.append(cron)
+    seen_files = {f for f, _ in candidates}
+
+    # Drop cache entries for deleted files and repos
+    for path in _cron_cache.keys() - seen_files:
+        del _cron_cache[path]
+    for path in _cron_dirs.keys() - seen_dirs:
+        del _cron_dirs[path]
     return crons
 
 
+def get_crons() -> list[dict]:
+    """Get all cron jobs from .sandboxer/cron-*.yaml files."""
+    global _crons, _crons_scanned
+    with _crons_lock:
+        # Missing watches would hide edits: fall back to the scheduler's recheck interval
+        interval = CRON_RESCAN_INTERVAL if _watches_complete else CRON_RECHECK_INTERVAL
+        if (_crons is not None and not _crons_changed()
+                and time.monotonic() - _crons_scanned < interval):
+            return _crons
+        crons = _scan_crons()
+        if crons != _crons:
+            _crons = crons  # Keep the old list when unchanged so UI caches stay valid
+            _cron_wakeup.set()
+        _crons_scanned = time.monotonic()
+        return _crons
+
+
+def _open_cron_log(name: str) -> int:
+    """Open a cron's log for appending; one fd per run, so a rotated or deleted log is recreated."""
+    os.makedirs(CRON_LOG_DIR, exist_ok=True)
+    return os.open(f"{CRON_LOG_DIR}/cron-{name}.log",
+                   os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC, 0o644)
+
+
+def _cron_log(fd: int, text: str):
+    """Append to a cron's log with os.write on its O_APPEND fd."""
+    # Each line is a single append write, so concurrent runs can't interleave mid-line
+    data = text.encode()
+    while data:
+        data = data[os.write(fd, data):]
+
+
+_conditions: dict[tuple[str, str], tuple[bool, float]] = {}  # (condition, workdir) -> (met, expires)
+_conditions_lock = threading.Lock()
+
+
+def check_condition(condition: str, workdir: str) -> bool:
+    """Run a cron condition, reusing a recent result for the same repo."""
+    # Crons sharing a condition and repo often fire in the same minute
+    key = (condition, workdir)
+    now = time.monotonic()
+    with _conditions_lock:
+        for k in [k for k, (_, expires) in _conditions.items() if expires <= now]:
+            del _conditions[k]
+        if key in _conditions:
+            return _conditions[key][0]
+    # Bounded, so a hung condition (e.g. git fetch on a dead remote) can't block shutdown
+    try:
+        met = subprocess.run(
+            condition, shell=True, cwd=workdir,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            timeout=CRON_CONDITION_TIMEOUT
+        ).returncode == 0
+    except subprocess.TimeoutExpired:
+        met = False
+    with _conditions_lock:
+        _conditions[key] = (met, time.monotonic() + CRON_CONDITION_TTL)
+    return met
+
+
 def run_cron(cron: dict):
     """Execute a cron job - creates visible tmux session for claude."""
-    from datetime import datetime
-
     name = cron["name"]
     workdir = cron["workdir"]
-    log_path = f"/var/log/sandboxer/cron-{name}.log"
-
-    os.makedirs("/var/log/sandboxer", exist_ok=True)
+    log_fd = _open_cron_log(name)
 
-    with open(log_path, "a") as log:
-        log.write(f"\n{'='*60}\n")
-        log.write(f"[{datetime.now().isoformat()}] CRON: {name}\n")
-        log.flush()
+    try:
+        _cron_log(log_fd, f"\n{'='*60}\n[{datetime.now().isoformat()}] CRON: {name}\n")
 
         # Check condition if specified
         if cron.get("condition"):
-            result = subprocess.run(
-                cron["condition"], shell=True, cwd=workdir,
-                capture_output=True, text=True
-            )
-            if result.returncode != 0:
-                log.write(f"[{datetime.now().isoformat()}] CONDITION NOT MET ✗\n")
+            if not check_condition(cron["condition"], workdir):
+                _cron_log(log_fd, f"[{datetime.now().isoformat()}] CONDITION NOT MET ✗\n")
                 return
-            log.write(f"[{datetime.now().isoformat()}] CONDITION MET ✓\n")
-            log.flush()
-
-    # Execute based on type
-    if cron["type"] == "claude":
-        # Create tmux session like regular claude sessions
-        prompt = cron.get("prompt", "Run scheduled task")
-        session_name = f"cron-{name}"
-
-        # Kill existing if any
-        subprocess.run(["tmux", "kill-session", "-t", session_name], capture_output=True)
-
-        # Create session
-        subprocess.run(["tmux", "new-session", "-d", "-s", session_name, "-c", workdir], capture_output=True)
-        subprocess.run(["tmux", "set", "-t", session_name, "mouse", "on"], capture_output=True)
-
-        # Start claude with IS_SANDBOX=1 (same as web UI)
-        # Use heredoc to avoid bash history expansion issues with ! and other special chars
-        cmd = f"IS_SANDBOX=1 claude --dangerously-skip-permissions --system-prompt {SYSTEM_PROMPT} -p \"$(cat <<'PROMPT'\n{prompt}\nPROMPT\n)\""
-        subprocess.run(["tmux", "send-keys", "-t", session_name, cmd, "Enter"], capture_output=True)
-
-        # Register session
-        _sessions[session_name] = {"workdir": workdir, "type": "claude"}
-        if session_name not in _order:
-            _order.insert(0, session_name)
-        _save()
+            _cron_log(log_fd, f"[{datetime.now().isoformat()}] CONDITION MET ✓\n")
+
+        # Execute based on type
+        if cron["type"] == "claude":
+            # Create tmux session like regular claude sessions
+            prompt = cron.get("prompt", "Run scheduled task")
+            session_name = f"cron-{name}"
+
+            # Kill existing if any
+            _tmux("kill-session", "-t", session_name)
+
+            # Start claude with IS_SANDBOX=1 (same as web UI)
+            # Use heredoc to avoid bash history expansion issues with ! and other special chars
+            cmd = f"IS_SANDBOX=1 claude --dangerously-skip-permissions --system-prompt {SYSTEM_PROMPT} -p \"$(cat <<'PROMPT'\n{prompt}\nPROMPT\n)\""
+
+            # Create session, enable mouse and start claude in one tmux invocation
+            _tmux("new-session", "-d", "-s", session_name, "-c", workdir,
+                  ";", "set", "-t", session_name, "mouse", "on",
+                  ";", "send-keys", "-t", session_name, cmd, "Enter")
+
+            # Register session
+            _sessions[session_name] = {"workdir": workdir, "type": "claude"}
+            if session_name not in _order:
+                _order.insert(0, session_name)
+            _invalidate_sessions()
+            _save()
 
-        with open(log_path, "a") as log:
-            log.write(f"[{datetime.now().isoformat()}] SPAWNING CLAUDE → session: {session_name}\n")
-    else:
-        # Bash command - run in background and log
-        command = cron.get("command", "echo 'No command specified'")
+            _cron_log(log_fd, f"[{datetime.now().isoformat()}] SPAWNING CLAUDE → session: {session_name}\n")
+        else:
+            # Bash command - run in background and log
+            command = cron.get("command", "echo 'No command specified'")
 
-        def run_job():
-            with open(log_path, "a") as log:
-                log.write(f"[{datetime.now().isoformat()}] RUNNING: {command[:50]}...\n")
-                log.flush()
+            def run_job(fd: int):
                 try:
+                    _cron_log(fd, f"[{datetime.now().isoformat()}] RUNNING: {command[:50]}...\n")
                     result = subprocess.run(
                         command, shell=True, cwd=workdir,
                         capture_output=True, text=True, timeout=3600
                     )
                     if result.stdout:
-                        log.write(result.stdout)
+                        _cron_log(fd, result.stdout)
                     if result.stderr:
-                        log.write(f"STDERR: {result.stderr}")
-                    log.write(f"[{datetime.now().isoformat()}] EXIT: {result.returncode}\n")
+                        _cron_log(fd, f"STDERR: {result.stderr}")
+                    _cron_log(fd, f"[{datetime.now().isoformat()}] EXIT: {result.returncode}\n")
                 except subprocess.TimeoutExpired:
-                    log.write(f"[{datetime.now().isoformat()}] TIMEOUT after 1h\n")
+                    _cron_log(fd, f"[{datetime.now().isoformat()}] TIMEOUT after 1h\n")
                 except Exception as e:
-                    log.write(f"[{datetime.now().isoformat()}] ERROR: {e}\n")
+                    _cron_log(fd, f"[{datetime.now().isoformat()}] ERROR: {e}\n")
+                finally:
+                    os.close(fd)
 
-        threading.Thread(target=run_job, daemon=True).start()
+            threading.Thread(target=run_job, args=(log_fd,), daemon=True).start()
+            log_fd = None  # Owned and closed by the job thread now
+    finally:
+        if log_fd is not None:
+            os.close(log_fd)
 
 
-def cron_scheduler():
-    """Background thread that checks and runs crons."""
-    import time
-    from datetime import datetime
+_cron_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cron")
+
+
+def _run_cron_safe(cron: dict):
+    try:
+        run_cron(cron)
+    except Exception as e:
+        print(f"[cron] Error with {cron['name']}: {e}")
+
+
+@functools.lru_cache(maxsize=256)
+def _cron_iter(schedule: str):
+    """Parsed croniter per schedule string (scheduler thread only, it is stateful)."""
     from croniter import croniter
+    return croniter(schedule)
 
-    last_run = {}  # Track last run time per cron
 
-    while True:
-        try:
-            now = datetime.now()
-            crons = get_crons()
+def _next_run(schedule: str, after: datetime) -> datetime:
+    """Next run time of a schedule after the given naive local datetime."""
+    it = _cron_iter(schedule)
+    it.set_current(after)
+    return it.get_next(datetime)
 
-            for cron in crons:
-                if not cron.get("enabled", True):
-                    continue
-                if not cron.get("schedule"):
-                    continue
 
-                cron_id = cron["path"]
-                schedule = cron["schedule"]
+def cron_scheduler():
+    """Background thread that sleeps until the next cron is due and runs it."""
+    crons = None
+    by_path = {}
+    heap = []  # (next_run, path, schedule), soonest first
 
-                try:
-                    cron_iter = croniter(schedule, now)
-                    prev_time = cron_iter.get_prev(datetime)
-
-                    # Check if we should run (within last minute and not already run)
-                    if (now - prev_time).total_seconds() < 60:
-                        last = last_run.get(cron_id)
-                        if last is None or (now - last).total_seconds() >= 60:
-                            print(f"[cron] Running: {cron['name']}")
-                            last_run[cron_id] = now
-                            run_cron(cron)
-                except Exception as e:
-                    print(f"[cron] Error with {cron['name']}: {e}")
+    # Fail fast instead of erroring on every parse and every schedule
+    try:
+        _yaml_load()
+        from croniter import croniter  # noqa: F401
+    except ImportError as e:
+        print(f"[cron] Scheduler disabled: {e}")
+        return
+
+    while not _cron_stop.is_set():
+        try:
+            current = get_crons()
+            if current is not crons:
+                # Rebuild heap, keeping pending run times of unchanged crons
+                crons = current
+                by_path = {c["path"]: c for c in crons if c.get("enabled", True) and c.get("schedule")}
+                pending = {(path, schedule): ts for ts, path, schedule in heap}
+                now = datetime.now()
+                heap = []
+                for path, cron in by_path.items():
+                    schedule = cron["schedule"]
+                    ts = pending.get((path, schedule))
+                    if ts is None:
+                        try:
+                            ts = _next_run(schedule, now)
+                        except Exception as e:
+                            print(f"[cron] Error with {cron['name']}: {e}")
+                            continue
+                    heap.append((ts, path, schedule))
+                heapq.heapify(heap)
+
+            now = datetime.now()
+            while heap and heap[0][0] <= now:
+                _, path, schedule = heapq.heappop(heap)
+                cron = by_path[path]
+                print(f"[cron] Running: {cron['name']}")
+                # Run off the scheduler thread so slow conditions don't delay other crons
+                _cron_executor.submit(_run_cron_safe, cron)
+                heapq.heappush(heap, (_next_run(schedule, now), path, schedule))
         except Exception as e:
             print(f"[cron] Scheduler error: {e}")
 
-        time.sleep(30)  # Check every 30 seconds
+        delay = (heap[0][0] - datetime.now()).total_seconds() if heap else CRON_RECHECK_INTERVAL
+        _cron_wakeup.wait(min(max(delay, 0), CRON_RECHECK_INTERVAL))
+        _cron_wakeup.clear()
+
+
+def stop_cron_scheduler():
+    """Stop the scheduler loop and drop cron runs that have not started yet."""
+    _cron_stop.set()
+    _cron_wakeup.set()
+    _cron_executor.shutdown(wait=False, cancel_futures=True)
+
+
+_cron_sidebar: tuple[list, str] | None = None  # (crons list it was built from, html)
+
+
+def build_cron_sidebar(crons: list[dict]) -> str:
+    """Build sidebar cron list HTML, cached until get_crons() returns a new list."""
+    global _cron_sidebar
+    cached = _cron_sidebar
+    if cached and cached[0] is crons:
+        return cached[1]
+
+    html = ['<li class="sidebar-type-header sidebar-cron-header" onclick="toggleCrons()">cron <span class="cron-toggle">▼</span></li>']
+    for c in crons:
+        name = escape(c["name"])
+        path = escape(c["path"])
+        workdir = escape(c["workdir"])
+        enabled = "enabled" if c["enabled"] else "disabled"
+        schedule_human = escape(c.get("schedule_human", ""))
+        freq = f' <span class="cron-freq">({schedule_human})</span>' if schedule_human else ""
+        html.append(f'<li class="sidebar-cron {enabled}" data-workdir="{workdir}" onclick="openCron(\'{path}\')">{name}{freq}</li>')
+    _cron_sidebar = (crons, "\n".join(html))
+    return _cron_sidebar[1]
 
 
 def build_sidebar_sessions() -> str:
@@ -410,15 +812,7 @@ def build_sidebar_sessions() -> str:
 
     # Crons (collapsible)
     if crons:
-        html.append('<li class="sidebar-type-header sidebar-cron-header" onclick="toggleCrons()">cron <span class="cron-toggle">▼</span></li>')
-        for c in crons:
-            name = escape(c["name"])
-            path = escape(c["path"])
-            workdir = escape(c["workdir"])
-            enabled = "enabled" if c["enabled"] else "disabled"
-            schedule_human = escape(c.get("schedule_human", ""))
-            freq = f' <span class="cron-freq">({schedule_human})</span>' if schedule_human else ""
-            html.append(f'<li class="sidebar-cron {enabled}" data-workdir="{workdir}" onclick="openCron(\'{path}\')">{name}{freq}</li>')
+        html.append(build_cron_sidebar(crons))
 
     return "\n".join(html)
 
@@ -513,25 +907,29 @@ class Handler(http.server.BaseHTTPRequestHandler):
         if path == "/api/capture":
             name = q.get("session", [""])[0]
             if name:
-                # Get pane dimensions
-                dims = subprocess.run(
-                    ["tmux", "display-message", "-t", name, "-p", "#{pane_width} #{pane_height}"],
-                    capture_output=True, text=True
-                )
+                # Background refreshes send the activity of their last copy; idle windows skip tmux
+                activity = _list_sessions().get(name, ("", ""))[1]
+                if activity and q.get("since", [""])[0] == activity:
+                    self.send_json({"unchanged": True})
+                    return
+                now = time.time()
+
+                # Pane dimensions (first line) and content in one tmux invocation
+                r = _tmux("display-message", "-t", name, "-p", "#{pane_width} #{pane_height}",
+                          ";", "capture-pane", "-t", name, "-p", "-e", capture=True)
+                dims, _, content = r.stdout.partition("\n") if r.returncode == 0 else ("", "", "")
                 cols, rows = 80, 24
-                if dims.returncode == 0:
-                    parts = dims.stdout.strip().split()
-                    if len(parts) == 2:
-                        cols, rows = int(parts[0]), int(parts[1])
-
-                r = subprocess.run(
-                    ["tmux", "capture-pane", "-t", name, "-p", "-e"],
-                    capture_output=True, text=True
-                )
+                parts = dims.split()
+                if len(parts) == 2:
+                    cols, rows = int(parts[0]), int(parts[1])
+
                 self.send_json({
-                    "content": r.stdout if r.returncode == 0 else "",
+                    "content": content,
                     "cols": cols,
-                    "rows": rows
+                    "rows": rows,
+                    # Activity has 1s resolution: only hand it out once its second is over,
+                    # so any output after this capture is guaranteed to change it
+                    "activity": activity if activity and now >= int(activity) + 1 else "",
                 })
             else:
                 self.send_json({"content": "", "cols": 80, "rows": 24})
@@ -542,7 +940,9 @@ class Handler(http.server.BaseHTTPRequestHandler):
             t = q.get("type", ["claude"])[0]
             d = q.get("dir", [f"{GIT_DIR}/sandboxer"])[0]
             name = generate_name(t, d)
-            create_session(name, t, d)
+            if not create_session(name, t, d):
+                self.send_json({"ok": False, "error": f"could not create session {name}"})
+                return
             s = {"name": name, "title": name, "workdir": d, "type": t}
             self.send_json({"ok": True, "name": name, "html": build_card(s)})
             return
@@ -556,18 +956,20 @@ class Handler(http.server.BaseHTTPRequestHandler):
             name = f"cron-{cron_name}"
 
             # Kill existing if any
-            subprocess.run(["tmux", "kill-session", "-t", name], capture_output=True)
-
-            # Create session
-            subprocess.run(["tmux", "new-session", "-d", "-s", name, "-c", d], capture_output=True)
-            subprocess.run(["tmux", "set", "-t", name, "mouse", "on"], capture_output=True)
+            _tmux("kill-session", "-t", name)
 
             # Script that sets up split panes after terminal is sized
-            script = f'''#!/bin/bash
-sleep 0.3
-tmux split-window -h -t {name} 2>/dev/null
-tmux send-keys -t {name}:0.1 "clear; echo '─── Log ───'; mkdir -p /var/log/sandboxer; touch {log_path}; tail -f {log_path}" Enter 2>/dev/null
-tmux select-pane -t {name}:0.0 2>/dev/null
+            script = f'''
+# Runs as the pane's command: Ctrl-C must drop to a shell, not close the pane
+trap 'exec bash' INT
+# Wait for the web terminal to attach (bounded) instead of a fixed sleep
+for _ in $(seq 60); do
+  [ "$(tmux display-message -p -t {name} '#{{session_attached}}' 2>/dev/null)" != "0" ] && break
+  sleep 0.05
+done
+tmux split-window -h -t {name} \\; \\
+  send-keys -t {name}:0.1 "clear; echo '─── Log ───'; mkdir -p /var/log/sandboxer; touch {log_path}; tail -f {log_path}" Enter \\; \\
+  select-pane -t {name}:0.0 2>/dev/null
 clear
 echo '─── {os.path.basename(cron_path)} ───'
 echo
@@ -578,16 +980,14 @@ read -r
 nano {cron_path}
 exec bash
 '''
-            # Write script to temp file and execute
-            script_path = f"/tmp/cron-setup-{cron_name}.sh"
-            with open(script_path, "w") as f:
-                f.write(script)
-            os.chmod(script_path, 0o755)
-            subprocess.run(["tmux", "send-keys", "-t", name, f"bash {script_path}", "Enter"], capture_output=True)
+            # Create session running the script directly (no temp file) and enable mouse
+            _tmux("new-session", "-d", "-s", name, "-c", d, "bash", "-c", script,
+                  ";", "set", "-t", name, "mouse", "on")
 
             _sessions[name] = {"workdir": d, "type": "cron"}
             if name not in _order:
                 _order.insert(0, name)
+            _invalidate_sessions()
             _save()
 
             s = {"name": name, "title": f"cron: {cron_name}", "workdir": d, "type": "cron"}
@@ -621,11 +1021,10 @@ exec bash
 
             if len(parts) >= 1 and parts[0] != "terminal":
                 folder_name = urllib.parse.unquote(parts[0])
-                # Find full path matching this folder name
-                for d in get_directories():
-                    if os.path.basename(d) == folder_name:
-                        url_folder = d
-                        break
+                # Folders are GIT_DIR/<name>, so check the one path instead of listing them all
+                d = f"{GIT_DIR}/{folder_name}"
+                if folder_name[:1] not in ("", ".") and "/" not in folder_name and os.path.isdir(d):
+                    url_folder = d
 
             if len(parts) == 2:
                 url_session = urllib.parse.unquote(parts[1])
@@ -658,16 +1057,15 @@ exec bash
             return
 
         if path == "/api/selected-folder":
-            _selected_folder = body.decode().strip() or "/"
-            os.makedirs(DATA_DIR, exist_ok=True)
-            with open(f"{DATA_DIR}/selected_folder", "w") as f:
-                f.write(_selected_folder)
+            # Shares the fixed .tmp name and _written with _flush, so serialize on its lock
+            with _save_lock:
+                _selected_folder = body.decode().strip() or "/"
+                os.makedirs(DATA_DIR, exist_ok=True)
+                _write_atomic(f"{DATA_DIR}/selected_folder", _selected_folder)
             self.send_json({"ok": True})
             return
 
         if path == "/api/upload":
-            import base64
-            import time
             data = json.loads(body)
             filename = data.get("filename", "upload")
             content = base64.b64decode(data.get("content", ""))
@@ -692,12 +1090,20 @@ def start_ws():
     asyncio.run(ws.main("127.0.0.1", WS_PORT))
 
 
+def _shutdown(*_):
+    # Stop cron dispatch before exit joins the pool and flushes session state
+    stop_cron_scheduler()
+    exit(0)
+
+
 def main():
-    signal.signal(signal.SIGTERM, lambda *a: exit(0))
-    signal.signal(signal.SIGINT, lambda *a: exit(0))
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
 
     _load()
     load_templates()
+    _inotify_init()
+    atexit.register(_flush)
 
     # Start WebSocket server
     threading.Thread(target=start_ws, daemon=True).start()
@@ -105,12 +105,17 @@ function createTerminal(name, container) {
 
 async function loadTerminalContent(name, clear = false) {
   try {
-    const res = await fetch(`/api/capture?session=${encodeURIComponent(name)}`);
+    // Periodic refreshes pass the activity of the copy we have; server skips idle sessions
+    const activity = clear && terminals.get(name)?.activity;
+    const since = activity ? `&since=${activity}` : "";
+    const res = await fetch(`/api/capture?session=${encodeURIComponent(name)}${since}`);
     const data = await res.json();
+    if (data.unchanged) return;
     if (data.content) {
       const t = terminals.get(name);
       if (t) {
         if (clear) t.term.reset();
+        t.activity = data.activity;
 
         // If we have tmux dimensions and not currently attached, scale to fit
         if (data.cols && data.rows && currentSession !== name) {
@@ -156,6 +161,7 @@ function attachSession(name, skipUrlUpdate = false) {
 
   const t = terminals.get(name);
   if (!t) return;
+  t.activity = null; // Attaching rescales it, so the next refresh must recapture
 
   // Reset font size and fit to container properly
   t.term.options.fontSize = 9; // Reset to default
@@ -12,26 +12,91 @@ import termios
 
 import websockets
 
+SEND_MAX = 16384  # Merge queued PTY output into WebSocket frames up to this size
+SEND_DELAY = 0.002  # Let a burst (prompt + escape codes) finish before sending a small frame
+PTY_BUFFER_MAX = 262144  # Stop reading the PTY while this much output waits for a slow client
+
+
+def _reap(pid: int):
+    try:
+        os.waitpid(pid, 0)
+    except ChildProcessError:
+        pass
+
+
+def _stop_child(pid: int):
+    """SIGTERM the attach process group and reap it off the event loop."""
+    try:
+        os.killpg(pid, signal.SIGTERM)  # Child called setsid, so its pgid is its pid
+    except ProcessLookupError:
+        # No such group yet: the child hasn't reached setsid, so signal it directly
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    asyncio.get_running_loop().run_in_executor(None, _reap, pid)
+
 
 async def handle_client(websocket):
     """Handle a WebSocket client connection."""
+    loop = asyncio.get_running_loop()
     master_fd = None
     pid = None
     read_task = None
 
-    async def pty_reader():
+    async def pty_reader(fd: int):
         """Read from PTY and send to WebSocket."""
-        nonlocal master_fd
-        loop = asyncio.get_event_loop()
-        while master_fd is not None:
+        queue: asyncio.Queue[bytes | None] = asyncio.Queue()
+        pending = 0  # Bytes queued but not yet sent
+        paused = False
+
+        def on_readable():
+            # Called by the event loop when the PTY has output: no executor thread, no polling
+            nonlocal pending, paused
             try:
-                data = await loop.run_in_executor(None, lambda: os.read(master_fd, 65536))
-                if data:
-                    await websocket.send(data)
-            except (OSError, BlockingIOError):
-                await asyncio.sleep(0.01)
-            except Exception:
-                break
+                data = os.read(fd, 65536)
+            except BlockingIOError:
+                return
+            except OSError:
+                data = b""  # EIO: the attach process exited
+            if not data:
+                loop.remove_reader(fd)
+                queue.put_nowait(None)
+                return
+            queue.put_nowait(data)
+            pending += len(data)
+            if pending >= PTY_BUFFER_MAX:
+                # Backpressure: leave output in the PTY (and tmux) until the client catches up
+                loop.remove_reader(fd)
+                paused = True
+
+        loop.add_reader(fd, on_readable)
+        try:
+            while (data := await queue.get()) is not None:
+                if len(data) < SEND_MAX:
+                    await asyncio.sleep(SEND_DELAY)
+                # Coalesce whatever arrived meanwhile into one frame
+                buf = bytearray(data)
+                while len(buf) < SEND_MAX and not queue.empty():
+                    data = queue.get_nowait()
+                    if data is None:
+                        queue.put_nowait(None)  # EOF is last: send this frame, then stop
+                        break
+                    buf += data
+                await websocket.send(bytes(buf))
+                pending -= len(buf)
+                if paused and pending < PTY_BUFFER_MAX:
+                    paused = False
+                    loop.add_reader(fd, on_readable)
+        except Exception:
+            pass
+
+    def close_pty():
+        """Stop watching the PTY before closing it, so a reused fd number isn't affected."""
+        nonlocal master_fd
+        loop.remove_reader(master_fd)
+        os.close(master_fd)
+        master_fd = None
 
     try:
         async for message in websocket:
@@ -56,12 +121,9 @@ async def handle_client(websocket):
                             except asyncio.CancelledError:
                                 pass
                         if master_fd is not None:
-                            os.close(master_fd)
+                            close_pty()
                         if pid is not None:
-                            try:
-                                os.kill(pid, signal.SIGTERM)
-                            except ProcessLookupError:
-                                pass
+                            _stop_child(pid)
 
                         # Create PTY and fork
                         master_fd, slave_fd = pty.openpty()
@@ -91,7 +153,7 @@ async def handle_client(websocket):
                         fcntl.ioctl(master_fd, termios.TIOCSWINSZ, winsize)
 
                         # Start reader
-                        read_task = asyncio.create_task(pty_reader())
+                        read_task = asyncio.create_task(pty_reader(master_fd))
                         await websocket.send(json.dumps({"status": "attached", "session": session}))
 
                     elif action == "resize":
@@ -105,13 +167,9 @@ async def handle_client(websocket):
                         if read_task:
                             read_task.cancel()
                         if master_fd is not None:
-                            os.close(master_fd)
-                            master_fd = None
+                            close_pty()
                         if pid is not None:
-                            try:
-                                os.kill(pid, signal.SIGTERM)
-                            except ProcessLookupError:
-                                pass
+                            _stop_child(pid)
                             pid = None
 
                 except (json.JSONDecodeError, ValueError):
@@ -128,12 +186,9 @@ async def handle_client(websocket):
         if read_task:
             read_task.cancel()
         if master_fd is not None:
-            os.close(master_fd)
+            close_pty()
         if pid is not None:
-            try:
-                os.kill(pid, signal.SIGTERM)
-            except ProcessLookupError:
-                pass
+            _stop_child(pid)
 
 
 async def main(host: str = "127.0.0.1", port: int = 8082):